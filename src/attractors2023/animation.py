@@ -0,0 +1,163 @@
+"""Render animations morphing between sets of attractor parameters.
+
+Parameter sets use the same format as the examples stored in ``attractors.yml``, i.e.
+``[name, colormap, x, y, a, b, ...]``. Frames are obtained by interpolating the values linearly between successive
+keyframes, and are rendered in parallel on a canvas covering the same region for the whole animation.
+
+Example:
+
+    >>> params = ParameterSets()
+    >>> start, end = (['Clifford', *args] for args in params.args('Clifford')[:2])
+    >>> render_animation([start, end], n_frames=100, output_dir='frames')
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from colorcet import palette
+from numpy.typing import NDArray
+
+from attractors2023.attractors import ParameterSets
+from attractors2023.maths import process_pool
+from attractors2023.shared import render_attractor, trajectory_range
+
+METADATA_FILENAME = 'animation.json'
+
+_worker_params: ParameterSets | None = None
+
+
+def interpolate_parameters(keyframes: list[list], n_frames: int) -> list[list]:
+    """Return ``n_frames`` parameter sets interpolated linearly between keyframes.
+
+    All keyframes must be for the same kind of attractor. The colormap of the first keyframe is used for all frames.
+    """
+    if len(keyframes) < 2:  # noqa: PLR2004
+        msg = 'At least two keyframes are required to make an animation.'
+        raise ValueError(msg)
+    if n_frames < 1:
+        msg = f'An animation needs at least one frame, got n_frames={n_frames}.'
+        raise ValueError(msg)
+    name, colormap = keyframes[0][:2]
+    if any(k[0] != name for k in keyframes):
+        msg = 'All keyframes must be for the same kind of attractor.'
+        raise ValueError(msg)
+    values = np.array([k[2:] for k in keyframes], dtype=float)
+
+    frames = []
+    for t in np.linspace(0, len(keyframes) - 1, n_frames):
+        i = min(int(t), len(keyframes) - 2)
+        frac = t - i
+        frames.append([name, colormap, *((1 - frac) * values[i] + frac * values[i + 1]).tolist()])
+    return frames
+
+
+def canvas_range(
+    frames: list[list], n: int = 100000, n_samples: int = 10, margin: float = 0.05, params: ParameterSets | None = None
+) -> tuple[tuple[float, float], tuple[float, float]]:
+    """Return x and y ranges covering the trajectories of a sample of frames."""
+    if params is None:
+        params = ParameterSets()
+    bounds = []
+    for i in np.unique(np.linspace(0, len(frames) - 1, n_samples).round().astype(int)):
+        try:
+            xlim, ylim = trajectory_range(params.get_attractor(*frames[i]), n=n, margin=0)
+        except ValueError:
+            continue
+        bounds.append([*xlim, *ylim])
+    if not bounds:
+        msg = 'Trajectories of the animation frames do not contain any finite points.'
+        raise ValueError(msg)
+    xmin, ymin = np.min(bounds, axis=0)[[0, 2]]
+    xmax, ymax = np.max(bounds, axis=0)[[1, 3]]
+    dx, dy = margin * (xmax - xmin), margin * (ymax - ymin)
+    return (float(xmin - dx), float(xmax + dx)), (float(ymin - dy), float(ymax + dy))
+
+
+def _init_worker(name: str) -> None:
+    """Create the attractors of a worker process and compile the kernel of the animated attractor."""
+    global _worker_params  # noqa: PLW0603
+    _worker_params = ParameterSets()
+    _worker_params.attractors[name](n=2)
+
+
+def render_frame(
+    frame: list,
+    n: int,
+    size: int,
+    xlim: tuple[float, float],
+    ylim: tuple[float, float],
+    plot_type: str = 'points',
+    path: Path | None = None,
+) -> NDArray[np.uint8]:
+    """Render a single frame as an RGBA array, optionally saving it to a PNG file."""
+    params = _worker_params if _worker_params is not None else ParameterSets()
+    attractor = params.get_attractor(*frame)
+    cmap = palette[attractor.colormap][::-1]
+    image = next(render_attractor(attractor(n=n), plot_type, cmap, size, x_range=xlim, y_range=ylim)).to_pil()
+    if path is not None:
+        # write to a temporary file first so that an interrupted job never leaves a truncated frame behind
+        tmp_path = path.with_suffix('.tmp')
+        image.save(tmp_path, format='PNG')
+        tmp_path.replace(path)
+    return np.asarray(image)
+
+
+def _render_frame(args: tuple) -> NDArray[np.uint8]:
+    return render_frame(*args)
+
+
+def _save_frame(args: tuple) -> None:
+    render_frame(*args)
+
+
+def render_animation(
+    keyframes: list[list],
+    n_frames: int,
+    n: int = 1000000,
+    size: int = 500,
+    plot_type: str = 'points',
+    output_dir: str | Path | None = None,
+    nprocs: int = 8,
+) -> NDArray[np.uint8] | list[Path]:
+    """Render an animation interpolated between keyframes.
+
+    Frames are rendered in parallel by ``nprocs`` processes, each compiling the attractor kernel once at start-up.
+    Without ``output_dir``, the frames are returned as an array of shape ``(n_frames, size, size, 4)``. Otherwise,
+    they are saved as numbered PNG files and their paths are returned. Running the same job again with the same
+    ``output_dir`` resumes it, only rendering the frames that are missing, with the canvas range of the first run.
+    """
+    frames = interpolate_parameters(keyframes, n_frames)
+    name = frames[0][0]
+
+    if output_dir is None:
+        xlim, ylim = canvas_range(frames)
+        args = [(frame, n, size, xlim, ylim, plot_type, None) for frame in frames]
+        with process_pool(nprocs, initializer=_init_worker, initargs=(name,)) as pool:
+            images = pool.map(_render_frame, args)
+        return np.stack(images)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    width = max(4, len(str(n_frames - 1)))
+    paths = [output_dir / f'frame_{i:0{width}d}.png' for i in range(n_frames)]
+    metadata_path = output_dir / METADATA_FILENAME
+    metadata = {'frames': frames, 'n': n, 'size': size, 'plot_type': plot_type}
+    if metadata_path.exists():
+        saved = json.loads(metadata_path.read_text())
+        if {k: saved[k] for k in metadata} != metadata:
+            msg = f'{output_dir} contains frames of a different animation.'
+            raise FileExistsError(msg)
+        xlim, ylim = tuple(saved['xlim']), tuple(saved['ylim'])
+    else:
+        xlim, ylim = canvas_range(frames)
+        metadata_path.write_text(json.dumps({**metadata, 'xlim': xlim, 'ylim': ylim}))
+    todo = [i for i, path in enumerate(paths) if not path.exists()]
+    if not todo:
+        # all frames were rendered by a previous run
+        return paths
+
+    save_args = [(frames[i], n, size, xlim, ylim, plot_type, paths[i]) for i in todo]
+    with process_pool(nprocs, initializer=_init_worker, initargs=(name,)) as pool:
+        # frames saved to disk are not sent back to the main process
+        pool.map(_save_frame, save_args)
+    return paths
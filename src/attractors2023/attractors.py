@@ -23,9 +23,12 @@ Changes include:
 - rename ``.sig()`` method ``.signature()``
 - use ``np.random.default_rng()`` instead of ``numpy.random.seed()``
 - move ``trajectory_coords()`` and ``trajectory()`` functions to new ``maths.py`` module
+- register each attractor, to compile a kernel with a uniform signature on first use (see ``maths.get_kernel()``)
+- avoid divide-by-zero errors of ``Bedhead`` in ``params_array()``, used by all computations, instead of ``__call__()``
 
 """
 import inspect
+from collections.abc import Callable
 from pathlib import Path
 
 import numpy as np
@@ -34,10 +37,19 @@ import param
 import yaml
 from numba import jit
 from numpy import cos, fabs, sin, sqrt
-from numpy.typing import ArrayLike, NDArray
+from numpy.typing import NDArray
 from param import concrete_descendents
 
-from attractors2023.maths import compute_multiple, trajectory
+from attractors2023.maths import (
+    N_PARAMS,
+    compute_counts,
+    compute_multiple,
+    ensemble_advance,
+    get_kernel,
+    kernel_trajectory,
+    kernel_trajectory_counts,
+    register_kernel,
+)
 
 RNG = np.random.default_rng(12)
 
@@ -70,29 +82,99 @@ class Attractor(param.Parameterized):
 
     __abstract = True
 
+    def __init_subclass__(cls, **kwargs):
+        """Register each attractor family defining its own equation, to compile its kernel when first used."""
+        super().__init_subclass__(**kwargs)
+        if 'fn' in cls.__dict__:
+            register_kernel(cls.__name__, cls.fn)
+
     def __call__(self, n: int, x: float | None = None, y: float | None = None) -> pd.DataFrame:
         """Return a dataframe with `n` points."""
         if x is not None:
             self.x = x
         if y is not None:
             self.y = y
-        args = [getattr(self, p) for p in self.signature()]
-        return trajectory(self.fn, *args, n=n)
+        return kernel_trajectory(self.kernel, self.x, self.y, self.params_array(), n=n)
+
+    @property
+    def kernel(self) -> Callable:
+        """Compiled step function of this attractor, taking (x, y, params) arguments."""
+        return get_kernel(self.__class__.__name__)
+
+    def params_array(self) -> NDArray[np.float64]:
+        """Return the parameters of the attractor (without x and y) as an array of floats for its kernel."""
+        values = [getattr(self, name) for name in self.signature()[2:]]
+        p = np.zeros(N_PARAMS)
+        p[: len(values)] = values
+        return p
 
     def compute(
-        self, xlim: tuple[float, float] = (-2, 2), ylim: tuple[float, float] = (-2, 2), n_points: int = 1000000
+        self,
+        xlim: tuple[float, float] = (-2, 2),
+        ylim: tuple[float, float] = (-2, 2),
+        n_points: int = 1000000,
+        n_origins: int = 4,
+        client=None,
     ) -> pd.DataFrame:
         """Return a list of dataframes with *n* points"""
-        args = [getattr(self, p) for p in self.signature()]
-        global partial_fn  # hack to ensure multiprocessing works
-
-        def partial_fn(x: ArrayLike, y: ArrayLike) -> NDArray:
-            """Partial version of attractor equation with only (x,y) arguments."""
-            return self.fn(x, y, *args[2:])
-
-        all_dfs = compute_multiple(partial_fn, xlim, ylim, n_points=n_points, n_origins=4, nprocs=8)
+        # the kernel is passed by name to be sent cheaply to the worker processes
+        all_dfs = compute_multiple(
+            self.__class__.__name__,
+            self.params_array(),
+            xlim,
+            ylim,
+            n_points=n_points,
+            n_origins=n_origins,
+            client=client,
+        )
         return pd.concat(all_dfs)
 
+    def compute_counts(
+        self,
+        xlim: tuple[float, float] = (-2, 2),
+        ylim: tuple[float, float] = (-2, 2),
+        n_points: int = 1000000,
+        shape: tuple[int, int] = (700, 700),
+        n_origins: int = 4,
+        client=None,
+    ) -> NDArray[np.int64]:
+        """Return a 2D grid with the number of trajectory points falling in each cell."""
+        return compute_counts(
+            self.__class__.__name__,
+            self.params_array(),
+            xlim,
+            ylim,
+            n_points=n_points,
+            shape=shape,
+            n_origins=n_origins,
+            client=client,
+        )
+
+    def stream_counts(
+        self,
+        n: int,
+        xlim: tuple[float, float],
+        ylim: tuple[float, float],
+        shape: tuple[int, int] = (700, 700),
+    ) -> NDArray[np.int64]:
+        """Return a 2D grid with the number of the `n` trajectory points falling in each cell.
+
+        Unlike ``__call__()``, the points are not kept in memory, so `n` can be arbitrarily large.
+        """
+        xlim = (float(xlim[0]), float(xlim[1]))
+        ylim = (float(ylim[0]), float(ylim[1]))
+        p = self.params_array()
+        return kernel_trajectory_counts(self.kernel, float(self.x), float(self.y), p, n, xlim, ylim, shape)
+
+    def ensemble(self, n_particles: int = 100000, burn_in: int = 20) -> tuple[NDArray, NDArray]:
+        """Return the positions of particles drawn within the soft bounds of x and y, after `burn_in` iterations."""
+        xmin, xmax = self.param.x.get_soft_bounds()
+        ymin, ymax = self.param.y.get_soft_bounds()
+        xs = RNG.uniform(xmin, xmax, n_particles)
+        ys = RNG.uniform(ymin, ymax, n_particles)
+        ensemble_advance(self.kernel, xs, ys, self.params_array(), burn_in)
+        return xs, ys
+
     def vals(self):
         return [self.__class__.name] + [self.colormap] + [getattr(self, p) for p in self.signature()]
 
@@ -162,12 +244,13 @@ class Bedhead(Attractor):
     def fn(x, y, a, b, *o):
         return y * sin(x * y / b) + cos(a * x - y), x + sin(y) / b
 
-    def __call__(self, n):
-        # Avoid interactive divide-by-zero errors for b
+    def params_array(self) -> NDArray[np.float64]:
+        # Avoid interactive divide-by-zero errors for b, in every computation using the kernel
+        p = super().params_array()
         epsilon = 3 * np.finfo(float).eps
-        if -epsilon < self.b < epsilon:
-            self.b = epsilon
-        return super(Bedhead, self).__call__(n)
+        if -epsilon < p[1] < epsilon:
+            p[1] = epsilon
+        return p
 
 
 class Hopalong1(Attractor):
@@ -237,7 +320,7 @@ class SymmetricIcon(Attractor):
         p = a * zzbar + l
         zreal, zimag = x, y
 
-        for _i in range(1, d - 1):
+        for _i in range(1, int(d) - 1):
             za, zb = zreal * x - zimag * y, zimag * x + zreal * y
             zreal, zimag = za, zb
 
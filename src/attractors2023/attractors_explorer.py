@@ -16,9 +16,12 @@ from panel.layout import HSpacer
 from panel.pane import LaTeX
 
 from attractors2023 import attractors as at
-from attractors2023.shared import render_attractor
+from attractors2023.memory import BUDGET, MB, MemoryBudgetError, estimate_bytes
+from attractors2023.shared import render_attractor, render_counts
 
 RNG = np.random.default_rng(12)
+#: Number of trajectories computed for each view, starting from random points
+N_ORIGINS = 4
 
 pn.extension('katex')
 pn.config.throttled = True
@@ -62,8 +65,27 @@ class AttractorsExplorer(param.Parameterized):
 
     @param.depends('attractor_type.param', 'plot_type', 'n_points', 'xlim', 'ylim')
     def view(self):
-        all_points = self.attractor_type.compute(xlim=self.xlim, ylim=self.ylim, n_points=self.n_points)
-        return render_attractor(all_points, self.plot_type, palette[self.attractor_type.colormap][::-1])  # type: ignore
+        cmap = palette[self.attractor_type.colormap][::-1]
+        # compute() follows N_ORIGINS trajectories of n_points each
+        nbytes = estimate_bytes(N_ORIGINS * self.n_points, 'limited')
+        try:
+            with BUDGET.reserve(nbytes):
+                all_points = self.attractor_type.compute(
+                    xlim=self.xlim, ylim=self.ylim, n_points=self.n_points, n_origins=N_ORIGINS
+                )
+                return render_attractor(all_points, self.plot_type, cmap)  # type: ignore
+        except MemoryBudgetError as exc:
+            if self.plot_type != 'points':
+                usage = BUDGET.usage()
+                return pn.pane.Alert(
+                    f'{exc}<br>Memory reserved: {usage["current"] / MB:,.0f} MB (peak: {usage["peak"] / MB:,.0f} MB)',
+                    alert_type='danger',
+                )
+        # too many points to keep in memory: aggregate each trajectory into a grid of counts instead
+        counts = self.attractor_type.compute_counts(
+            xlim=self.xlim, ylim=self.ylim, n_points=self.n_points, n_origins=N_ORIGINS
+        )
+        return render_counts(counts, self.xlim, self.ylim, cmap)
 
     @param.depends('attractor_type')
     def equations(self):
@@ -18,7 +18,9 @@ from panel.pane import LaTeX
 from panel.widgets import DiscretePlayer
 
 from attractors2023 import attractors as at
-from attractors2023.shared import render_attractor
+from attractors2023.coordinator import COORDINATOR, render_key
+from attractors2023.memory import BUDGET, MB, MemoryBudgetError
+from attractors2023.shared import render_ensemble, render_within_budget
 
 pn.extension('katex')
 
@@ -38,15 +40,31 @@ class AttractorsViewer(param.Parameterized):
 
     n = param.Integer(2000000, bounds=(1, None), softbounds=(1, 50000000), doc='Number of points', precedence=0.85)
 
+    preview = param.Boolean(False, doc='Render a quick preview from a cloud of particles', precedence=0.86)
+
     @param.depends('parameters.param', watch=True)
     def _update_from_parameters(self):
         a = params.get_attractor(*self.parameters())
         if a is not self.attractor_type:
             self.param.update(attractor_type=a)
 
-    @param.depends('attractor_type.param', 'plot_type', 'n')
+    @param.depends('attractor_type.param', 'plot_type', 'n', 'preview')
     def view(self):
-        return render_attractor(self.attractor_type(n=self.n), self.plot_type, palette[self.attractor_type.colormap][::-1])
+        attractor, n, plot_type = self.attractor_type, self.n, self.plot_type
+        cmap = palette[attractor.colormap][::-1]
+        if self.preview:
+            return render_ensemble(attractor, cmap=cmap)
+        # identical renders requested by several sessions are only computed once
+        try:
+            return COORDINATOR.get(
+                render_key(attractor, n, plot_type), lambda: render_within_budget(attractor, n, plot_type, cmap)
+            )
+        except MemoryBudgetError as exc:
+            usage = BUDGET.usage()
+            return pn.pane.Alert(
+                f'{exc}<br>Memory reserved: {usage["current"] / MB:,.0f} MB (peak: {usage["peak"] / MB:,.0f} MB)',
+                alert_type='danger',
+            )
 
     @param.depends('attractor_type')
     def equations(self):
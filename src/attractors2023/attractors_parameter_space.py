@@ -0,0 +1,165 @@
+"""Panel dashboard to explore the parameter space of attractors.
+
+The map on the left shows a statistic (e.g. Lyapunov exponent) over two parameters of the selected attractor, the
+other parameters keeping their current values. Zooming into the map computes it again over the new region, first at
+a coarse resolution and then progressively finer. Clicking on the map loads the corresponding parameters into the
+attractor displayed on the right.
+
+The app can be launched with:
+
+    > panel serve --show src/attractors2023/attractors_parameter_space.py
+
+"""
+import holoviews as hv
+import panel as pn
+import param
+from colorcet import palette
+from panel.layout import HSpacer
+from panel.pane import LaTeX
+
+from attractors2023 import attractors as at
+from attractors2023.parameter_space import STATISTICS, parameter_range, progressive_parameter_map
+from attractors2023.shared import render_within_budget
+
+pn.extension('katex')
+hv.extension('bokeh')
+
+params = at.ParameterSets(name='Attractors')
+
+
+class ParameterSpaceExplorer(param.Parameterized):
+    """Map a statistic over two parameters of an attractor and render the attractor for the selected pixel."""
+
+    attractor_type = param.ObjectSelector(params.attractors['Clifford'], objects=params.attractors, precedence=0.9)
+    parameters = param.ObjectSelector(params, precedence=-0.5, readonly=True)
+
+    x_param = param.ObjectSelector('a', objects=['a', 'b'], doc='Parameter along the x axis of the map')
+    y_param = param.ObjectSelector('b', objects=['a', 'b'], doc='Parameter along the y axis of the map')
+    statistic = param.ObjectSelector('lyapunov', objects=list(STATISTICS), doc='Statistic to map')
+    resolution = param.Integer(200, bounds=(10, 1000), doc='Number of pixels along each axis of the map')
+
+    n = param.Integer(2000000, bounds=(1, None), softbounds=(1, 50000000), doc='Number of points', precedence=0.85)
+
+    def __init__(self, **params):
+        super().__init__(**params)
+        self._pending = iter(())
+        self._refinement = None
+        self._fixed: dict[str, float] = {}
+        self._ranges: tuple = (None, None)
+        self.pipe = hv.streams.Pipe(data=None)
+        self.map = hv.DynamicMap(self._image, streams=[self.pipe])
+        self.range_xy = hv.streams.RangeXY(source=self.map)
+        self.range_xy.add_subscriber(self._zoom)
+        self.tap = hv.streams.Tap(source=self.map, x=None, y=None)
+        self.tap.add_subscriber(self._select)
+        self._update_param_names()
+
+    @param.depends('parameters.param', watch=True)
+    def _update_from_parameters(self):
+        a = params.get_attractor(*self.parameters())
+        if a is not self.attractor_type:
+            self.param.update(attractor_type=a)
+
+    @param.depends('attractor_type', watch=True)
+    def _update_param_names(self):
+        names = self.attractor_type.signature()[2:]
+        self.param.x_param.objects = names
+        self.param.y_param.objects = names
+        with param.parameterized.discard_events(self):
+            self.param.update(x_param=names[0], y_param=names[1])
+        self._refresh()
+
+    def _fixed_values(self) -> dict[str, float]:
+        """Return the values of the parameters that are not mapped, on which the map also depends."""
+        names = self.attractor_type.signature()
+        return {name: getattr(self.attractor_type, name) for name in names if name not in (self.x_param, self.y_param)}
+
+    @param.depends('attractor_type.param', watch=True)
+    def _update_fixed_parameters(self):
+        """Recompute the map over the same region when one of the parameters that are not mapped changes."""
+        names = self.attractor_type.signature()
+        if self.x_param not in names or self.y_param not in names:
+            # new attractor type, handled by _update_param_names()
+            return
+        if self._fixed_values() != self._fixed:
+            self._refresh(*self._ranges)
+
+    @param.depends('x_param', 'y_param', 'statistic', 'resolution', watch=True)
+    def _refresh(self, x_range=None, y_range=None):
+        """Compute the map progressively: coarse map now, finer maps on the next ticks."""
+        if self._refinement is not None:
+            self._refinement.stop()
+            self._refinement = None
+        self._fixed = self._fixed_values()
+        self._ranges = (x_range, y_range)
+        if self.x_param == self.y_param:
+            self.pipe.send(None)
+            return
+        if x_range is None:
+            x_range = parameter_range(self.attractor_type, self.x_param)
+        if y_range is None:
+            y_range = parameter_range(self.attractor_type, self.y_param)
+        self._pending = progressive_parameter_map(
+            self.attractor_type,
+            self.x_param,
+            self.y_param,
+            resolution=self.resolution,
+            statistic=self.statistic,
+            x_range=x_range,
+            y_range=y_range,
+        )
+        self._next_level()
+        self._refinement = pn.state.add_periodic_callback(self._next_level, period=50)
+
+    def _next_level(self):
+        agg = next(self._pending, None)
+        if agg is None:
+            if self._refinement is not None:
+                self._refinement.stop()
+                self._refinement = None
+            return
+        self.pipe.send(agg)
+
+    def _zoom(self, x_range=None, y_range=None):
+        if x_range is not None and y_range is not None:
+            self._refresh(x_range=x_range, y_range=y_range)
+
+    def _select(self, x=None, y=None):
+        """Load the parameters of the clicked pixel into the attractor."""
+        if x is not None and y is not None:
+            self.attractor_type.param.update({self.x_param: x, self.y_param: y})
+
+    def _image(self, data):
+        if data is None:
+            return hv.Image([])
+        return hv.Image(data, kdims=[self.x_param, self.y_param], vdims=[self.statistic]).opts(
+            cmap='coolwarm', colorbar=True, width=500, height=500, tools=['hover', 'tap'], framewise=False
+        )
+
+    @param.depends('attractor_type.param', 'n')
+    def view(self):
+        attractor = self.attractor_type
+        return render_within_budget(attractor, self.n, 'points', palette[attractor.colormap][::-1], size=500)
+
+    @param.depends('attractor_type')
+    def equations(self):
+        if not self.attractor_type.equations:
+            return pn.Column()
+        return pn.Column(
+            '<b>' + self.attractor_type.__class__.name + ' attractor<b>',
+            *[LaTeX(e) for e in self.attractor_type.equations],
+        )
+
+
+ats = ParameterSpaceExplorer(name='Parameter space')
+params.current = lambda: ats.attractor_type
+
+pn.Row(
+    HSpacer(),
+    pn.Column(ats.map, pn.panel(ats.equations)),
+    pn.Spacer(max_width=20),
+    pn.Column(ats.view),
+    pn.Spacer(max_width=20),
+    pn.Column(pn.Param(ats.param, expand=True, width=220)),
+    HSpacer(),
+).servable('Attractors parameter space')
@@ -0,0 +1,94 @@
+"""Process-wide coordination of attractor renders shared by all sessions of a Panel app.
+
+With ``panel serve``, every session re-runs the app script and builds its own ``ParameterSets`` and viewer, but
+modules imported by the script (such as this one) are only imported once per process. The coordinator defined here
+is therefore shared by all sessions, and identical requests (same attractor class, parameters, point count and image
+size) are only computed once.
+
+Note that requests can only be merged while they are in flight when the server runs sessions concurrently,
+e.g. with ``panel serve --num-threads 4``. Otherwise, repeated requests are served from the cache of finished renders.
+"""
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import Any
+
+from attractors2023.attractors import Attractor
+
+
+def render_key(attractor: Attractor, n: int, plot_type: str = 'points', size: int = 700) -> tuple:
+    """Return a hashable key identifying the render of an attractor with its current parameters."""
+    return (*attractor.vals(), plot_type, int(n), int(size))
+
+
+class RenderCoordinator:
+    """Collapse identical concurrent render requests into a single computation.
+
+    The first request for a given key runs the computation, while identical requests arriving before it has finished
+    wait for the same result. Finished results are kept in a small LRU cache of ``max_cached`` items.
+    """
+
+    def __init__(self, max_cached: int = 16):
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._in_flight: dict[Hashable, Future] = {}
+        self._cache: OrderedDict[Hashable, Any] = OrderedDict()
+        self._counts = {'requests': 0, 'hits': 0, 'merged': 0, 'computed': 0, 'errors': 0}
+
+    def get(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Return the result of ``func()`` for the given key, sharing it with any identical request."""
+        with self._lock:
+            self._counts['requests'] += 1
+            if key in self._cache:
+                self._counts['hits'] += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            pending = self._in_flight.get(key)
+            if pending is None:
+                future: Future = Future()
+                self._in_flight[key] = future
+            else:
+                self._counts['merged'] += 1
+        if pending is not None:
+            return pending.result()
+
+        try:
+            result = func()
+        except BaseException as exc:
+            with self._lock:
+                self._counts['errors'] += 1
+                del self._in_flight[key]
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            self._counts['computed'] += 1
+            del self._in_flight[key]
+            if self.max_cached > 0:
+                self._cache[key] = result
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def metrics(self) -> dict[str, float]:
+        """Return request counters, as well as cache hit and in-flight merge rates."""
+        with self._lock:
+            metrics: dict[str, float] = dict(self._counts)
+            metrics['in_flight'] = len(self._in_flight)
+            metrics['cached'] = len(self._cache)
+        requests = max(metrics['requests'], 1)
+        metrics['hit_rate'] = metrics['hits'] / requests
+        metrics['merge_rate'] = metrics['merged'] / requests
+        return metrics
+
+    def clear(self) -> None:
+        """Empty the cache of finished renders and reset the counters."""
+        with self._lock:
+            self._cache.clear()
+            for k in self._counts:
+                self._counts[k] = 0
+
+
+COORDINATOR = RenderCoordinator()
@@ -1,13 +1,75 @@
 """Functions to calculate trajectories of attractors."""
-from multiprocessing import Pool
+import operator
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.pool import Pool
 
 import numpy as np
 import pandas as pd
-from numba import jit
+from numba import jit, prange
 from numpy.typing import NDArray
 
 RNG = np.random.default_rng(12)
 
+#: Number of parameters passed to attractor kernels, after the (x,y) coordinates
+N_PARAMS = 6
+#: Numba signature shared by all attractor kernels: (x, y, params) -> (x, y)
+KERNEL_SIGNATURE = 'UniTuple(float64, 2)(float64, float64, float64[::1])'
+#: Equations of the attractor families, registered by name
+EQUATIONS: dict[str, Callable] = {}
+#: Compiled kernels of the attractor families, created on first use by ``get_kernel()``
+KERNELS: dict[str, Callable] = {}
+_kernels_lock = threading.Lock()
+
+
+def make_kernel(fn) -> Callable:
+    """Wrap attractor fn into a compiled step function taking the parameters as an array of floats.
+
+    All kernels have the same signature, so the engines below are compiled once per family, whatever the
+    types of the parameter values.
+    """
+
+    @jit(KERNEL_SIGNATURE, nopython=True)
+    def kernel(x, y, p):
+        return fn(x, y, p[0], p[1], p[2], p[3], p[4], p[5])
+
+    return kernel
+
+
+def register_kernel(name: str, fn) -> None:
+    """Register attractor fn with the given name. Its kernel is only compiled when first requested."""
+    with _kernels_lock:
+        EQUATIONS[name] = fn
+        KERNELS.pop(name, None)
+
+
+def process_pool(nprocs: int, **kwargs) -> Pool:
+    """Return a pool of ``nprocs`` worker processes, started with the 'spawn' method.
+
+    Forking is not safe once a parallel Numba kernel has started its threads (e.g. with the TBB threading layer), and
+    could hang the workers. Starting new interpreters is slow though, so this is only worth it for long jobs.
+    """
+    return get_context('spawn').Pool(nprocs, **kwargs)
+
+
+def get_kernel(kernel: str | Callable) -> Callable:
+    """Return the kernel registered with the given name, or the kernel itself if it is already compiled.
+
+    Kernels are compiled on first use, so that importing the attractors (e.g. in a new worker process) only compiles
+    the families that are actually used. Passing kernels by name keeps them cheap to pickle for worker processes.
+    """
+    if not isinstance(kernel, str):
+        return kernel
+    if kernel not in EQUATIONS:
+        # equations are registered when the attractor classes are defined, e.g. on import in a new worker process
+        import attractors2023.attractors  # noqa: F401
+    with _kernels_lock:
+        if kernel not in KERNELS:
+            KERNELS[kernel] = make_kernel(EQUATIONS[kernel])
+        return KERNELS[kernel]
+
 
 @jit(nopython=True)
 def trajectory_coords(fn, x0, y0, a, b, c, d, e, f, n) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
@@ -31,49 +93,217 @@ def trajectory(fn, x0, y0, a, b=None, c=None, d=None, e=None, f=None, n=1000000)
     return pd.DataFrame({'x': xs, 'y': ys})
 
 
-# @jit(nopython=True)
-def calculate_coords(fn, origin, xlim, ylim, n_points):
-    """Calculate trajectory of an attractor and limit the output to given 2D boundaries."""
-    x_coords = []
-    y_coords = []
+@jit(nopython=True, nogil=True)
+def kernel_trajectory_coords(kernel, x0, y0, p, n) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """
+    Given an attractor kernel and an array of parameters, compute n trajectory points (starting from x0,y0).
+    """
+    x, y = np.zeros(n), np.zeros(n)
+    x[0], y[0] = x0, y0
+    for i in range(n - 1):
+        x[i + 1], y[i + 1] = kernel(x[i], y[i], p)
+    return x, y
+
+
+def kernel_trajectory(kernel, x0: float, y0: float, p: NDArray[np.float64], n: int = 1000000) -> pd.DataFrame:
+    """
+    Given an attractor kernel and an array of parameters, compute n trajectory points (starting from x0,y0)
+    and return as a Pandas dataframe with columns x,y.
+    """
+    xs, ys = kernel_trajectory_coords(kernel, float(x0), float(y0), np.ascontiguousarray(p, dtype=np.float64), n)
+    return pd.DataFrame({'x': xs, 'y': ys})
+
+
+@jit(nopython=True, nogil=True)
+def kernel_trajectory_counts(kernel, x0, y0, p, n, xlim, ylim, shape) -> NDArray[np.int64]:
+    """
+    Given an attractor kernel and an array of parameters, count the n trajectory points (starting from x0,y0)
+    falling in each cell of a 2D grid covering the given boundaries, with y along the first axis.
+
+    Points are binned as they are computed, so memory usage does not depend on n.
+    """
+    height, width = shape
+    xmin, xmax = xlim
+    ymin, ymax = ylim
+    counts = np.zeros((height, width), dtype=np.int64)
+    x, y = x0, y0
+    for _ in range(n):
+        if xmin <= x <= xmax and ymin <= y <= ymax:
+            i = min(int((y - ymin) / (ymax - ymin) * height), height - 1)
+            j = min(int((x - xmin) / (xmax - xmin) * width), width - 1)
+            counts[i, j] += 1
+        x, y = kernel(x, y, p)
+    return counts
+
+
+@jit(nopython=True, nogil=True, parallel=True, fastmath=True)
+def ensemble_advance(kernel, xs, ys, p, n_steps, block_size=256) -> None:
+    """
+    Given an attractor kernel and an array of parameters, advance an ensemble of particles by n_steps in place.
+
+    Particles are independent: blocks of particles are processed in parallel, and within each block, every step
+    is applied to all its particles in a loop over contiguous arrays that can be vectorized by the compiler.
+    """
+    n = len(xs)
+    for b in prange((n + block_size - 1) // block_size):
+        start = b * block_size
+        stop = min(start + block_size, n)
+        for _ in range(n_steps):
+            for i in range(start, stop):
+                xs[i], ys[i] = kernel(xs[i], ys[i], p)
+
+
+@jit(nopython=True, nogil=True)
+def bin_points(xs, ys, xlim, ylim, counts) -> None:
+    """Add the points falling within the given boundaries to a 2D grid of counts, with y along the first axis."""
+    height, width = counts.shape
+    xmin, xmax = xlim
+    ymin, ymax = ylim
+    for k in range(len(xs)):
+        x, y = xs[k], ys[k]
+        if xmin <= x <= xmax and ymin <= y <= ymax:
+            i = min(int((y - ymin) / (ymax - ymin) * height), height - 1)
+            j = min(int((x - xmin) / (xmax - xmin) * width), width - 1)
+            counts[i, j] += 1
+
 
-    xn, yn = origin
-    for _ in np.arange(n_points):
-        x_next, y_next = fn(xn, yn)
-        if (x_next >= xlim[0]) and (x_next <= xlim[1]) and (y_next >= ylim[0]) and (y_next <= ylim[1]):
-            x_coords.append(x_next)
-            y_coords.append(y_next)
-        xn, yn = x_next, y_next
-    return x_coords, y_coords
+def ensemble_counts(
+    kernel,
+    xs: NDArray[np.float64],
+    ys: NDArray[np.float64],
+    p: NDArray[np.float64],
+    n_steps: int,
+    xlim: tuple[float, float],
+    ylim: tuple[float, float],
+    shape: tuple[int, int] = (700, 700),
+) -> NDArray[np.int64]:
+    """Advance an ensemble of particles (in place) and count their positions at each of n_steps on a 2D grid."""
+    xlim = (float(xlim[0]), float(xlim[1]))
+    ylim = (float(ylim[0]), float(ylim[1]))
+    counts = np.zeros(shape, dtype=np.int64)
+    for _ in range(n_steps):
+        ensemble_advance(kernel, xs, ys, p, 1)
+        bin_points(xs, ys, xlim, ylim, counts)
+    return counts
+
+
+@jit(nopython=True, nogil=True)
+def kernel_limited_coords(kernel, x0, y0, p, xlim, ylim, n) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """
+    Given an attractor kernel and an array of parameters, compute n trajectory points (starting from x0,y0)
+    and only return those within the given 2D boundaries.
+    """
+    xs, ys = np.empty(n), np.empty(n)
+    k = 0
+    x, y = x0, y0
+    for _ in range(n):
+        x, y = kernel(x, y, p)
+        if xlim[0] <= x <= xlim[1] and ylim[0] <= y <= ylim[1]:
+            xs[k], ys[k] = x, y
+            k += 1
+    return xs[:k].copy(), ys[:k].copy()
 
 
-# @jit(nopython=True)
 def limited_trajectory(
-    func,
+    kernel: str | Callable,
+    p: NDArray[np.float64],
     origin: tuple[float, float] = (0, 0),
     xlim: tuple[float, float] = (-2, 2),
     ylim: tuple[float, float] = (-2, 2),
     n_points: int = 1000000,
 ) -> pd.DataFrame:
     """Calculate trajectory of an attractor and limit the output to given 2D boundaries."""
-    x, y = calculate_coords(func, origin, xlim, ylim, n_points)
+    xlim = (float(xlim[0]), float(xlim[1]))
+    ylim = (float(ylim[0]), float(ylim[1]))
+    x, y = kernel_limited_coords(get_kernel(kernel), float(origin[0]), float(origin[1]), p, xlim, ylim, n_points)
     return pd.DataFrame({'x': x, 'y': y})
 
 
+def limited_counts(
+    kernel: str | Callable,
+    p: NDArray[np.float64],
+    origin: tuple[float, float] = (0, 0),
+    xlim: tuple[float, float] = (-2, 2),
+    ylim: tuple[float, float] = (-2, 2),
+    n_points: int = 1000000,
+    shape: tuple[int, int] = (700, 700),
+) -> NDArray[np.int64]:
+    """Calculate trajectory of an attractor and count the points falling in each cell of a 2D grid.
+
+    The grid covers the given boundaries and has ``shape=(height, width)``, with y along the first axis.
+    Points are binned by the compiled kernel as they are computed, so memory usage does not depend on n_points.
+    """
+    xlim = (float(xlim[0]), float(xlim[1]))
+    ylim = (float(ylim[0]), float(ylim[1]))
+    x0, y0 = float(origin[0]), float(origin[1])
+    return kernel_trajectory_counts(get_kernel(kernel), x0, y0, p, n_points, xlim, ylim, shape)
+
+
+def tree_reduce(client, futures: list):
+    """Sum Dask futures pairwise on the cluster and return the gathered total."""
+    while len(futures) > 1:
+        pairs = [futures[i : i + 2] for i in range(0, len(futures), 2)]
+        futures = [
+            client.submit(operator.add, *pair) if len(pair) == 2 else pair[0]  # noqa: PLR2004
+            for pair in pairs
+        ]
+    return futures[0].result()
+
+
 def compute_multiple(
-    func,
+    kernel: str | Callable,
+    p: NDArray[np.float64],
     xlim: tuple[float, float],
     ylim: tuple[float, float],
     n_points: int,
     n_origins: int = 24,
     nprocs: int = 8,
+    client=None,
+    rng: np.random.Generator | None = None,
 ) -> list[pd.DataFrame]:
-    """Create image of the attractor's trajectory limited to a given region."""
+    """Create image of the attractor's trajectory limited to a given region.
+
+    The trajectories of the attractor kernel, with the array of parameters p, are calculated in parallel by a local
+    pool of ``nprocs`` threads (the compiled kernels release the GIL), or distributed over a Dask cluster if a
+    ``distributed.Client`` is provided. The kernel should be given by its registered name, so that it can be sent to the workers. Origins of
+    the trajectories are drawn with the random generator ``rng``, or the generator of this module by default.
+    """
     xmin, xmax = xlim
     ymin, ymax = ylim
-    origins = RNG.uniform((xmin, ymin), (xmax, ymax), size=(n_origins, 2))
-    args = [(func, origin, xlim, ylim, n_points) for origin in origins]
+    origins = (RNG if rng is None else rng).uniform((xmin, ymin), (xmax, ymax), size=(n_origins, 2))
+    args = [(kernel, p, origin, xlim, ylim, n_points) for origin in origins]
+    if client is not None:
+        return client.gather(client.map(limited_trajectory, *zip(*args, strict=True)))
     # all_dfs = [limited_trajectory(*arg) for arg in args]
-    with Pool(nprocs) as p:
-        all_dfs = p.starmap(limited_trajectory, args)
+    with ThreadPoolExecutor(max_workers=nprocs) as pool:
+        all_dfs = list(pool.map(limited_trajectory, *zip(*args, strict=True)))
     return all_dfs
+
+
+def compute_counts(
+    kernel: str | Callable,
+    p: NDArray[np.float64],
+    xlim: tuple[float, float],
+    ylim: tuple[float, float],
+    n_points: int,
+    shape: tuple[int, int] = (700, 700),
+    n_origins: int = 24,
+    nprocs: int = 8,
+    client=None,
+    rng: np.random.Generator | None = None,
+) -> NDArray[np.int64]:
+    """Count the points of the attractor's trajectories on a 2D grid covering a given region.
+
+    Same as ``compute_multiple()``, except that each worker reduces its trajectory to a grid of counts, so only
+    small arrays are transferred. With a Dask ``client``, the partial grids are summed on the cluster with a tree
+    reduction.
+    """
+    xmin, xmax = xlim
+    ymin, ymax = ylim
+    origins = (RNG if rng is None else rng).uniform((xmin, ymin), (xmax, ymax), size=(n_origins, 2))
+    args = [(kernel, p, origin, xlim, ylim, n_points, shape) for origin in origins]
+    if client is not None:
+        return tree_reduce(client, client.map(limited_counts, *zip(*args, strict=True)))
+    with ThreadPoolExecutor(max_workers=nprocs) as pool:
+        all_counts = list(pool.map(limited_counts, *zip(*args, strict=True)))
+    return np.sum(all_counts, axis=0)
@@ -0,0 +1,102 @@
+"""Memory budget for the computation of attractor trajectories.
+
+Trajectories are held in memory as arrays of floats, so the number of points requested by the user directly drives the
+memory used by the process. The budget defined here is shared by all sessions of a Panel app. It can be configured
+with the ``ATTRACTORS2023_MEMORY_BUDGET`` environment variable (in MB), and requests that would exceed it are either
+computed with a streaming aggregation or rejected.
+"""
+import os
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+MB = 1024**2
+DEFAULT_BUDGET_MB = 1024
+
+
+class MemoryBudgetError(MemoryError):
+    """Raised when a computation would use more memory than allowed by the budget."""
+
+
+def estimate_bytes(n: int, path: str = 'trajectory', dtype: np.dtype | type = np.float64) -> int:
+    """Estimate the memory needed to compute ``n`` trajectory points with the given path.
+
+    The path is one of ``'trajectory'`` (``Attractor.__call__``), ``'limited'`` (``Attractor.compute``) or
+    ``'counts'`` (aggregation into a fixed grid, whatever the number of points).
+    """
+    itemsize = np.dtype(dtype).itemsize
+    if path == 'trajectory':
+        # x and y arrays, plus the copy held by the dataframe
+        return 4 * int(n) * itemsize
+    if path == 'limited':
+        # x and y arrays, the points kept within the boundaries, and the concatenated dataframe
+        return 6 * int(n) * itemsize
+    if path == 'counts':
+        return 0
+    msg = f'Unknown computation path: {path}'
+    raise ValueError(msg)
+
+
+def peak_rss() -> int | None:
+    """Return the peak resident memory of the process in bytes, if available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryBudget:
+    """Per-process budget of memory that computations must reserve before allocating large arrays."""
+
+    def __init__(self, limit: int | None = None):
+        if limit is None:
+            limit = int(float(os.environ.get('ATTRACTORS2023_MEMORY_BUDGET', DEFAULT_BUDGET_MB)) * MB)
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._current = 0
+        self._peak = 0
+
+    def available(self) -> int:
+        """Return the number of bytes that can still be reserved."""
+        with self._lock:
+            return self.limit - self._current
+
+    def fits(self, nbytes: int) -> bool:
+        """Return True if ``nbytes`` can be reserved now."""
+        return nbytes <= self.available()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        """Reserve ``nbytes`` for the duration of the context, or raise a ``MemoryBudgetError``."""
+        with self._lock:
+            if self._current + nbytes > self.limit:
+                available = self.limit - self._current
+                msg = (
+                    f'The computation needs about {nbytes / MB:,.0f} MB, but only {available / MB:,.0f} MB out of '
+                    f'{self.limit / MB:,.0f} MB are available. Try again with fewer points.'
+                )
+                raise MemoryBudgetError(msg)
+            self._current += nbytes
+            self._peak = max(self._peak, self._current)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._current -= nbytes
+
+    def usage(self) -> dict[str, int | None]:
+        """Return the limit, current and peak reserved bytes, as well as the peak memory of the process."""
+        with self._lock:
+            return {'limit': self.limit, 'current': self._current, 'peak': self._peak, 'peak_rss': peak_rss()}
+
+
+BUDGET = MemoryBudget()
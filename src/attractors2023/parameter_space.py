@@ -0,0 +1,145 @@
+"""Maps of a statistic of attractors over a 2D region of their parameter space.
+
+Each pixel of the map corresponds to a set of parameters, where two of the parameters of an attractor vary along the
+x and y axes and the other ones are fixed. Available statistics are:
+
+- ``lyapunov``: largest Lyapunov exponent of the trajectory, positive for chaotic (strange) attractors
+- ``extent``: size (diagonal of the bounding box) of the trajectory, zero if it converges to a fixed point
+"""
+from collections.abc import Iterator
+
+import numpy as np
+import xarray as xr
+from numba import jit, prange
+from numpy.typing import NDArray
+
+from attractors2023.attractors import Attractor
+
+STATISTICS = ('lyapunov', 'extent')
+
+
+@jit(nopython=True)
+def lyapunov_exponent(kernel, x0, y0, p, n_transient, n_iter, d0=1e-8) -> float:
+    """Estimate the largest Lyapunov exponent of a trajectory by following a nearby trajectory."""
+    x, y = x0, y0
+    for _ in range(n_transient):
+        x, y = kernel(x, y, p)
+    xe, ye = x + d0, y
+    total = 0.0
+    for _ in range(n_iter):
+        x, y = kernel(x, y, p)
+        xe, ye = kernel(xe, ye, p)
+        dx, dy = xe - x, ye - y
+        d = np.sqrt(dx * dx + dy * dy)
+        if not np.isfinite(d):
+            return np.nan
+        # trajectories merging (e.g. converging to a fixed point) give a large negative exponent
+        d = max(d, 1e-300)
+        total += np.log(d / d0)
+        # bring the nearby trajectory back to a distance d0
+        xe, ye = x + dx * d0 / d, y + dy * d0 / d
+    return total / n_iter
+
+
+@jit(nopython=True)
+def trajectory_extent(kernel, x0, y0, p, n_transient, n_iter) -> float:
+    """Return the diagonal of the bounding box of a trajectory, after discarding its first points."""
+    x, y = x0, y0
+    for _ in range(n_transient):
+        x, y = kernel(x, y, p)
+    xmin = xmax = x
+    ymin = ymax = y
+    for _ in range(n_iter):
+        x, y = kernel(x, y, p)
+        if not (np.isfinite(x) and np.isfinite(y)):
+            return np.nan
+        xmin, xmax = min(xmin, x), max(xmax, x)
+        ymin, ymax = min(ymin, y), max(ymax, y)
+    return np.sqrt((xmax - xmin) ** 2 + (ymax - ymin) ** 2)
+
+
+@jit(nopython=True, parallel=True)
+def parameter_map_values(kernel, x0, y0, p, ix, iy, xs, ys, statistic, n_transient, n_iter) -> NDArray[np.float64]:
+    """Compute the statistic (0 for lyapunov, 1 for extent) for each combination of values of parameters ix and iy."""
+    ny, nx = len(ys), len(xs)
+    values = np.empty((ny, nx))
+    for k in prange(ny * nx):
+        i, j = k // nx, k % nx
+        q = p.copy()
+        q[ix] = xs[j]
+        q[iy] = ys[i]
+        if statistic == 0:
+            values[i, j] = lyapunov_exponent(kernel, x0, y0, q, n_transient, n_iter)
+        else:
+            values[i, j] = trajectory_extent(kernel, x0, y0, q, n_transient, n_iter)
+    return values
+
+
+def parameter_range(attractor: Attractor, name: str, default: tuple[float, float] = (-3, 3)) -> tuple[float, float]:
+    """Return the range of values of an attractor parameter, from its soft bounds or hard bounds."""
+    low, high = attractor.param[name].get_soft_bounds()
+    return (default[0] if low is None else low, default[1] if high is None else high)
+
+
+def parameter_map(
+    attractor: Attractor,
+    x_param: str,
+    y_param: str,
+    x_range: tuple[float, float] | None = None,
+    y_range: tuple[float, float] | None = None,
+    resolution: int | tuple[int, int] = 200,
+    statistic: str = 'lyapunov',
+    n_transient: int = 100,
+    n_iter: int = 500,
+) -> xr.DataArray:
+    """Compute a map of the statistic over two parameters of the attractor, the other ones keeping their values.
+
+    Resolution is the number of pixels along both axes, or a (width, height) tuple. Ranges default to the bounds of
+    the parameters. Values are computed in parallel for each pixel, from the starting point of the attractor.
+    """
+    names = attractor.signature()[2:]
+    for name in (x_param, y_param):
+        if name not in names:
+            msg = f'{attractor.__class__.name} has no parameter {name!r}, expected one of {names}.'
+            raise ValueError(msg)
+    if x_param == y_param:
+        msg = f'The map needs two different parameters, got {x_param!r} twice.'
+        raise ValueError(msg)
+    if statistic not in STATISTICS:
+        msg = f'Unknown statistic {statistic!r}, expected one of {STATISTICS}.'
+        raise ValueError(msg)
+    if x_range is None:
+        x_range = parameter_range(attractor, x_param)
+    if y_range is None:
+        y_range = parameter_range(attractor, y_param)
+    width, height = (resolution, resolution) if isinstance(resolution, int) else resolution
+
+    # values at the centre of each pixel
+    dx, dy = (x_range[1] - x_range[0]) / width, (y_range[1] - y_range[0]) / height
+    xs = np.linspace(x_range[0] + dx / 2, x_range[1] - dx / 2, width)
+    ys = np.linspace(y_range[0] + dy / 2, y_range[1] - dy / 2, height)
+    values = parameter_map_values(
+        attractor.kernel,
+        float(attractor.x),
+        float(attractor.y),
+        attractor.params_array(),
+        names.index(x_param),
+        names.index(y_param),
+        xs,
+        ys,
+        STATISTICS.index(statistic),
+        n_transient,
+        n_iter,
+    )
+    return xr.DataArray(values, coords={y_param: ys, x_param: xs}, dims=(y_param, x_param), name=statistic)
+
+
+def progressive_parameter_map(
+    attractor: Attractor, x_param: str, y_param: str, resolution: int = 200, n_levels: int = 3, **kwargs
+) -> Iterator[xr.DataArray]:
+    """Yield maps of increasing resolution, doubling at each level up to the given resolution.
+
+    The first, coarse, maps are fast to compute and can be displayed while the next ones are calculated.
+    """
+    for level in reversed(range(n_levels)):
+        yield parameter_map(attractor, x_param, y_param, resolution=max(resolution // 2**level, 1), **kwargs)
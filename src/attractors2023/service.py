@@ -0,0 +1,183 @@
+"""Headless HTTP service rendering attractors as PNG images.
+
+The service can be launched with:
+
+    > python -m attractors2023.service --port 8000
+
+Images are requested with the family of attractor and, optionally, its parameters, colormap, size and number of
+points. Parameters that are not given take their values from the first example of this family in ``attractors.yml``.
+For example:
+
+    GET /render?family=Clifford&a=-1.4&b=1.6&c=1.0&d=0.7&colormap=fire&size=500&n=1000000
+
+Request counters, latency and throughput are returned as JSON by:
+
+    GET /stats
+"""
+import argparse
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from colorcet import palette
+
+from attractors2023.attractors import Attractor, ParameterSets
+from attractors2023.coordinator import RenderCoordinator, render_key
+from attractors2023.memory import BUDGET, MemoryBudget, MemoryBudgetError
+from attractors2023.shared import render_within_budget
+
+MAX_SIZE = 2000
+MAX_N = 100000000
+
+
+class RenderService:
+    """Render attractors into PNG images, with a bounded pool of workers and a cache of results."""
+
+    def __init__(self, max_workers: int = 4, max_cached: int = 64, budget: MemoryBudget = BUDGET):
+        self.params = ParameterSets(name='Attractors')
+        self.budget = budget
+        self.coordinator = RenderCoordinator(max_cached=max_cached)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='render')
+        self._stats_lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._counts = {'requests': 0, 'completed': 0, 'errors': 0, 'rejected': 0}
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def attractor(self, query: dict[str, str]) -> Attractor:
+        """Return a new attractor with the family, colormap and parameters given in the query."""
+        family = query.get('family')
+        if family not in self.params.attractors:
+            msg = f'Unknown attractor family {family!r}, expected one of {sorted(self.params.attractors)}.'
+            raise ValueError(msg)
+        template = self.params.attractors[family]
+        names = ['colormap', *template.signature()]
+        defaults = self.params.args(family)[0]
+        args = [query.get(name, default) for name, default in zip(names, defaults, strict=True)]
+        args[1:] = [float(v) for v in args[1:]]
+        if args[0] not in palette:
+            msg = f'Unknown colormap {args[0]!r}.'
+            raise ValueError(msg)
+        # requests are rendered concurrently: each one gets its own attractor, leaving the parameter sets unchanged
+        return template.__class__(**dict(zip(names, args, strict=True)))
+
+    def render(self, query: dict[str, str]) -> bytes:
+        """Return the PNG image of the attractor described by the query."""
+        attractor = self.attractor(query)
+        size = int(query.get('size', 500))
+        n = int(query.get('n', 1000000))
+        if not (1 <= size <= MAX_SIZE and 1 <= n <= MAX_N):
+            msg = f'Size must be between 1 and {MAX_SIZE}, and n between 1 and {MAX_N:,}.'
+            raise ValueError(msg)
+
+        def render_png():
+            cmap = palette[attractor.colormap][::-1]
+            image = render_within_budget(attractor, n, 'points', cmap, size=size, budget=self.budget)
+            buffer = io.BytesIO()
+            image.to_pil().save(buffer, format='PNG')
+            return buffer.getvalue()
+
+        # cached and merged requests do not hold a worker: only the computation itself is submitted to the pool
+        key = render_key(attractor, n, 'points', size)
+        return self.coordinator.get(key, lambda: self.executor.submit(render_png).result())
+
+    def handle(self, query: dict[str, str]) -> tuple[HTTPStatus, str, bytes]:
+        """Render the query and return the HTTP status, content type and body of the response."""
+        start = time.perf_counter()
+        with self._stats_lock:
+            self._counts['requests'] += 1
+        try:
+            body = self.render(query)
+        except MemoryBudgetError as exc:
+            status, body, count = HTTPStatus.SERVICE_UNAVAILABLE, str(exc).encode(), 'rejected'
+        except ValueError as exc:
+            status, body, count = HTTPStatus.BAD_REQUEST, str(exc).encode(), 'errors'
+        except Exception as exc:
+            # failures of the computation itself must still be answered, and counted
+            status, body, count = HTTPStatus.INTERNAL_SERVER_ERROR, f'Rendering failed: {exc}'.encode(), 'errors'
+        else:
+            status, count = HTTPStatus.OK, 'completed'
+        content_type = 'image/png' if status == HTTPStatus.OK else 'text/plain'
+        latency = time.perf_counter() - start
+        with self._stats_lock:
+            self._counts[count] += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+        return status, content_type, body
+
+    def stats(self) -> dict:
+        """Return request counters, latency (in seconds), throughput (per second) and cache metrics."""
+        with self._stats_lock:
+            stats: dict = dict(self._counts)
+            handled = sum(self._counts[k] for k in ('completed', 'errors', 'rejected'))
+            stats['latency_mean'] = self._latency_total / handled if handled else 0.0
+            stats['latency_max'] = self._latency_max
+        uptime = time.perf_counter() - self._started
+        stats['uptime'] = uptime
+        stats['throughput'] = stats['completed'] / uptime
+        stats['cache'] = self.coordinator.metrics()
+        stats['memory'] = self.budget.usage()
+        return stats
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Handle GET requests to the ``/render`` and ``/stats`` endpoints."""
+
+    service: RenderService
+
+    def do_GET(self):  # noqa: N802
+        url = urlparse(self.path)
+        if url.path == '/render':
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            status, content_type, body = self.service.handle(query)
+        elif url.path == '/stats':
+            status, content_type, body = HTTPStatus.OK, 'application/json', json.dumps(self.service.stats()).encode()
+        else:
+            status, content_type, body = HTTPStatus.NOT_FOUND, 'text/plain', b'Not found'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+def make_server(host: str = '127.0.0.1', port: int = 8000, **kwargs) -> ThreadingHTTPServer:
+    """Return an HTTP server for a new ``RenderService`` (created with ``kwargs``), available as ``server.service``."""
+    service = RenderService(**kwargs)
+    handler = type('Handler', (RenderRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.service = service  # type: ignore[attr-defined]
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve attractor images over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=4, help='maximum number of concurrent renders')
+    parser.add_argument('--cache', type=int, default=64, help='number of images kept in cache')
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, max_workers=args.workers, max_cached=args.cache)
+    print(f'Serving attractors on http://{args.host}:{server.server_port}/render')  # noqa: T201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()  # type: ignore[attr-defined]
+
+
+if __name__ == '__main__':
+    main()
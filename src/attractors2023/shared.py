@@ -1,23 +1,132 @@
 """Support functions for dashboards."""
 
 from collections.abc import Generator
+from typing import TYPE_CHECKING
 
 import datashader as ds
+import numpy as np
 import pandas as pd
+import xarray as xr
 from colorcet import palette
 from datashader import transfer_functions as tf
 from datashader.colors import inferno, viridis
+from numpy.typing import NDArray
+
+from attractors2023.maths import ensemble_counts
+from attractors2023.memory import BUDGET, MB, MemoryBudget, MemoryBudgetError, estimate_bytes
+
+if TYPE_CHECKING:
+    from attractors2023.attractors import Attractor
 
 palette['viridis'] = viridis
 palette['inferno'] = inferno
 
 
 def render_attractor(
-    trajectory: pd.DataFrame, plot_type: str = 'points', cmap: list | None = None, size: int = 700
+    trajectory: pd.DataFrame,
+    plot_type: str = 'points',
+    cmap: list | None = None,
+    size: int = 700,
+    x_range: tuple[float, float] | None = None,
+    y_range: tuple[float, float] | None = None,
 ) -> Generator:
-    """Render attractor's trajectory into an image using datashader."""
+    """Render attractor's trajectory into an image using datashader.
+
+    The canvas covers the extent of the trajectory, unless fixed ranges are given.
+    """
     if cmap is None:
         cmap = palette['inferno']
-    cvs = ds.Canvas(plot_width=size, plot_height=size)
+    cvs = ds.Canvas(plot_width=size, plot_height=size, x_range=x_range, y_range=y_range)
     agg = getattr(cvs, plot_type)(trajectory, 'x', 'y', agg=ds.count())
     yield tf.shade(agg, cmap=cmap)
+
+
+def render_counts(
+    counts: NDArray, xlim: tuple[float, float], ylim: tuple[float, float], cmap: list | None = None
+) -> tf.Image:
+    """Render a 2D grid of point counts (with y along the first axis) into an image using datashader."""
+    if cmap is None:
+        cmap = palette['inferno']
+    height, width = counts.shape
+    dx = (xlim[1] - xlim[0]) / width
+    dy = (ylim[1] - ylim[0]) / height
+    agg = xr.DataArray(
+        counts,
+        coords={
+            'y': np.linspace(ylim[0] + dy / 2, ylim[1] - dy / 2, height),
+            'x': np.linspace(xlim[0] + dx / 2, xlim[1] - dx / 2, width),
+        },
+        dims=('y', 'x'),
+    )
+    return tf.shade(agg.where(agg > 0), cmap=cmap)
+
+
+def trajectory_range(
+    attractor: 'Attractor', n: int = 100000, margin: float = 0.05
+) -> tuple[tuple[float, float], tuple[float, float]]:
+    """Return x and y ranges covering the first `n` points of the attractor's trajectory."""
+    points = attractor(n=n)
+    finite = points[np.isfinite(points).all(axis=1)]
+    if len(finite) == 0:
+        msg = 'The trajectory of the attractor does not contain any finite points.'
+        raise ValueError(msg)
+    xmin, xmax = finite.x.min(), finite.x.max()
+    ymin, ymax = finite.y.min(), finite.y.max()
+    dx, dy = margin * (xmax - xmin) or margin, margin * (ymax - ymin) or margin
+    return (float(xmin - dx), float(xmax + dx)), (float(ymin - dy), float(ymax + dy))
+
+
+def render_within_budget(
+    attractor: 'Attractor',
+    n: int,
+    plot_type: str = 'points',
+    cmap: list | None = None,
+    size: int = 700,
+    budget: MemoryBudget = BUDGET,
+) -> tf.Image:
+    """Render `n` points of the attractor's trajectory without exceeding the memory budget.
+
+    If the trajectory does not fit in the budget, the points are aggregated on the fly into a grid covering the range of
+    the beginning of the trajectory. Line plots need the whole trajectory and raise a ``MemoryBudgetError`` instead.
+    """
+    nbytes = estimate_bytes(n, 'trajectory')
+    try:
+        with budget.reserve(nbytes):
+            return next(render_attractor(attractor(n=n), plot_type, cmap, size))
+    except MemoryBudgetError:
+        if plot_type != 'points':
+            msg = (
+                f'{n:,} points would need about {nbytes / MB:,.0f} MB to plot as {plot_type}, more than the '
+                f'{budget.limit / MB:,.0f} MB allowed. Reduce the number of points or use the "points" plot type.'
+            )
+            raise MemoryBudgetError(msg) from None
+    xlim, ylim = trajectory_range(attractor)
+    counts = attractor.stream_counts(n, xlim, ylim, shape=(size, size))
+    return render_counts(counts, xlim, ylim, cmap)
+
+
+def render_ensemble(
+    attractor: 'Attractor',
+    n_particles: int = 100000,
+    n_steps: int = 30,
+    burn_in: int = 20,
+    cmap: list | None = None,
+    size: int = 700,
+    margin: float = 0.05,
+) -> tf.Image:
+    """Render a quick preview of the attractor by iterating a cloud of particles instead of a single trajectory.
+
+    The image shows the positions of the particles during `n_steps` iterations, after `burn_in` iterations to let
+    them converge towards the attractor.
+    """
+    xs, ys = attractor.ensemble(n_particles, burn_in)
+    finite = np.isfinite(xs) & np.isfinite(ys)
+    if not finite.any():
+        msg = 'All the particles have diverged.'
+        raise ValueError(msg)
+    xmin, xmax = xs[finite].min(), xs[finite].max()
+    ymin, ymax = ys[finite].min(), ys[finite].max()
+    dx, dy = margin * (xmax - xmin) or margin, margin * (ymax - ymin) or margin
+    xlim, ylim = (xmin - dx, xmax + dx), (ymin - dy, ymax + dy)
+    counts = ensemble_counts(attractor.kernel, xs, ys, attractor.params_array(), n_steps, xlim, ylim, (size, size))
+    return render_counts(counts, xlim, ylim, cmap)
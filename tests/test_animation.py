@@ -0,0 +1,50 @@
+"""Tests for the animation.py module."""
+import numpy as np
+import pytest
+
+from attractors2023 import animation
+
+START = ['Clifford', 'kbc', 0, 0, -1.9, -1.9, -1.9, -1.0]
+END = ['Clifford', 'viridis', 0, 0, 0.75, 1.34, -1.93, 1.0]
+
+
+def test_interpolate_parameters():
+    frames = animation.interpolate_parameters([START, END], n_frames=5)
+    assert len(frames) == 5
+    assert frames[0][2:] == pytest.approx(START[2:])
+    assert frames[-1][2:] == pytest.approx(END[2:])
+    assert frames[2][:2] == ['Clifford', 'kbc']
+    assert frames[2][4] == pytest.approx((START[4] + END[4]) / 2)
+
+    frames = animation.interpolate_parameters([START, END, START], n_frames=5)
+    assert frames[2][2:] == pytest.approx(END[2:])
+    assert frames[4][2:] == pytest.approx(START[2:])
+
+    with pytest.raises(ValueError, match='same kind'):
+        animation.interpolate_parameters([START, ['DeJong', 'kbc', 0, 0, 1, 1, 1, 1]], n_frames=5)
+    with pytest.raises(ValueError, match='at least one frame'):
+        animation.interpolate_parameters([START, END], n_frames=0)
+
+
+def test_render_animation():
+    images = animation.render_animation([START, END], n_frames=3, n=1000, size=20, nprocs=2)
+    assert isinstance(images, np.ndarray)
+    assert images.shape == (3, 20, 20, 4)
+
+
+def test_render_animation_resume(tmp_path):
+    paths = animation.render_animation([START, END], n_frames=3, n=1000, size=20, output_dir=tmp_path, nprocs=2)
+    assert [p.name for p in paths] == ['frame_0000.png', 'frame_0001.png', 'frame_0002.png']
+    assert all(p.exists() for p in paths)
+
+    paths[1].unlink()
+    mtime = paths[0].stat().st_mtime_ns
+    animation.render_animation([START, END], n_frames=3, n=1000, size=20, output_dir=tmp_path, nprocs=2)
+    assert paths[1].exists()
+    assert paths[0].stat().st_mtime_ns == mtime
+
+    # nothing left to render
+    assert animation.render_animation([START, END], n_frames=3, n=1000, size=20, output_dir=tmp_path) == paths
+
+    with pytest.raises(FileExistsError):
+        animation.render_animation([START, END], n_frames=4, n=1000, size=20, output_dir=tmp_path, nprocs=2)
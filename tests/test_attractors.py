@@ -1,8 +1,12 @@
 """Test functions for the attractors.py module."""
+import time
+
+import numpy as np
 import pandas as pd
 import pytest
 
 import attractors2023.attractors as at
+from attractors2023 import maths
 
 
 def test_attractor():
@@ -22,12 +26,68 @@ def test_attractor():
     assert points.shape == (5, 2)
 
 
+def test_attractor_kernel():
+    """Test the kernels registered for each family of attractors."""
+    assert set(maths.EQUATIONS) == set(at.concrete_descendents(at.Attractor))
+
+    fd = at.FractalDream()
+    p = fd.params_array()
+    assert p.dtype == np.float64
+    assert p.tolist() == [1.7, 1.7, 1.15, 2.34, 0, 0]
+    assert fd.kernel(1.0, 2.0, p) == pytest.approx(fd.fn(1, 2, 1.7, 1.7, 1.15, 2.34))
+    assert fd.kernel is maths.KERNELS['FractalDream']
+
+    icon = at.SymmetricIcon(d=4)
+    assert len(icon(n=10)) == 10
+    assert at.Bedhead().params_array().tolist() == [0.64, 0.76, 0, 0, 0, 0]
+
+
 def test_attractor_compute():
     """Test the compute() method of the Attractor class."""
     fd = at.FractalDream()
     all_points = fd.compute(n_points=10)
     assert len(all_points) == 23
     assert isinstance(all_points, pd.DataFrame)
+    assert len(fd.compute(xlim=(-5, 5), ylim=(-5, 5), n_points=10, n_origins=2)) == 20
+
+
+def test_attractor_compute_repeated():
+    """Repeated computations, as made by the explorer on every change, do not start new processes."""
+    fd = at.FractalDream()
+    fd.compute(n_points=10)
+    start = time.perf_counter()
+    for _ in range(5):
+        fd.compute(n_points=10, n_origins=8)
+        fd.compute_counts(n_points=10, shape=(10, 10))
+    assert time.perf_counter() - start < 2
+
+
+def test_attractor_compute_counts():
+    """Test the compute_counts() method of the Attractor class."""
+    fd = at.FractalDream()
+    counts = fd.compute_counts(xlim=(-5, 5), ylim=(-5, 5), n_points=10, shape=(10, 20))
+    assert counts.shape == (10, 20)
+    assert counts.sum() == 40
+
+
+def test_bedhead_zero_b():
+    """Bedhead divides by b: all computations use a small value instead of 0."""
+    bedhead = at.Bedhead(b=0.0)
+    assert bedhead.params_array()[1] > 0
+    assert bedhead.b == 0
+    xs, ys = bedhead.ensemble(100, 5)
+    assert xs.shape == ys.shape == (100,)
+    assert bedhead.stream_counts(100, (-3, 3), (-3, 3), shape=(10, 10)).sum() > 0
+    assert len(bedhead(n=10)) == 10
+
+
+def test_attractor_ensemble():
+    """Test the ensemble() method of the Attractor class."""
+    xs, ys = at.Clifford().ensemble(n_particles=100, burn_in=5)
+    assert xs.shape == ys.shape == (100,)
+    # Clifford attractor is bounded by 1 + |c| and 1 + |d|
+    assert np.abs(xs).max() <= 1.6
+    assert np.abs(ys).max() <= 2.2
 
 
 def test_parametersets():
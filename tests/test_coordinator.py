@@ -0,0 +1,71 @@
+"""Tests for the coordinator.py module."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import attractors2023.attractors as at
+from attractors2023.coordinator import RenderCoordinator, render_key
+
+
+def test_render_key():
+    clifford = at.Clifford()
+    key = render_key(clifford, n=100, plot_type='points', size=400)
+    assert key == ('Clifford', 'kgy', 0, 0, 1.7, 1.7, 0.6, 1.2, 'points', 100, 400)
+    assert render_key(at.Clifford(), n=100, plot_type='points', size=400) == key
+    assert render_key(at.DeJong(), n=100, plot_type='points', size=400) != key
+
+
+def test_coordinator_merges_in_flight_requests():
+    coordinator = RenderCoordinator()
+    calls = []
+    started = threading.Event()
+
+    def slow_render():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'image'
+
+    with ThreadPoolExecutor(4) as executor:
+        first = executor.submit(coordinator.get, 'key', slow_render)
+        started.wait()
+        others = [executor.submit(coordinator.get, 'key', slow_render) for _ in range(3)]
+        results = [first.result()] + [f.result() for f in others]
+
+    assert results == ['image'] * 4
+    assert len(calls) == 1
+    metrics = coordinator.metrics()
+    assert metrics['requests'] == 4
+    assert metrics['computed'] == 1
+    assert metrics['merged'] == 3
+    assert metrics['merge_rate'] == 0.75
+    assert metrics['in_flight'] == 0
+
+
+def test_coordinator_cache():
+    coordinator = RenderCoordinator(max_cached=1)
+    assert coordinator.get('a', lambda: 1) == 1
+    assert coordinator.get('a', lambda: 2) == 1
+    assert coordinator.get('b', lambda: 3) == 3
+    assert coordinator.get('a', lambda: 4) == 4
+    metrics = coordinator.metrics()
+    assert metrics['hits'] == 1
+    assert metrics['hit_rate'] == 0.25
+
+    coordinator.clear()
+    assert coordinator.metrics()['requests'] == 0
+
+
+def test_coordinator_errors():
+    coordinator = RenderCoordinator()
+
+    def failing_render():
+        msg = 'render failed'
+        raise ValueError(msg)
+
+    with pytest.raises(ValueError, match='render failed'):
+        coordinator.get('key', failing_render)
+    assert coordinator.metrics()['errors'] == 1
+    assert coordinator.get('key', lambda: 'image') == 'image'
@@ -1,4 +1,5 @@
 """Test functions for the maths.py module."""
+import numpy as np
 import pandas as pd
 import pytest
 from numba import jit
@@ -12,6 +13,12 @@ def fn(x, y, a, b, c, d, *o):
     return sin(b * y) + c * sin(b * x), sin(a * x) + d * sin(a * y)
 
 
+# parameters of fn (same equation as the FractalDream attractor) as passed to kernels
+P = np.array([1, 2, 1, -0.5, 0, 0], dtype=float)
+# origins of the new tests are drawn from their own generator, leaving the state of maths.RNG to the older tests
+RNG = np.random.default_rng(0)
+
+
 def test_trajectory_coords():
     """Test for the trajectory_coords() function."""
     x0 = 0.5
@@ -41,3 +48,117 @@ def test_trajectory():
     n = 5
     points = maths.trajectory(fn, x0, y0, a, b, c, d, e, f, n)
     assert isinstance(points, pd.DataFrame)
+
+
+def test_limited_trajectory():
+    """Test for the limited_trajectory() function."""
+    points = maths.limited_trajectory('FractalDream', P, (0.5, 0.5), xlim=(0, 3), ylim=(-3, 3), n_points=100)
+    assert isinstance(points, pd.DataFrame)
+    assert 0 < len(points) < 100
+    assert (points.x >= 0).all()
+
+
+def test_limited_counts():
+    """Test for the limited_counts() function."""
+    kernel = maths.make_kernel(fn)
+    counts = maths.limited_counts(kernel, P, (0.5, 0.5), xlim=(-3, 3), ylim=(-3, 3), n_points=100, shape=(20, 30))
+    assert counts.shape == (20, 30)
+    assert counts.sum() == 100
+
+
+def test_compute_counts():
+    """Test for the compute_counts() function with a local pool of threads."""
+    counts = maths.compute_counts(
+        'FractalDream', P, (-3, 3), (-3, 3), n_points=100, shape=(20, 20), n_origins=4, nprocs=2, rng=RNG
+    )
+    assert counts.shape == (20, 20)
+    assert counts.sum() == 400
+
+
+def test_compute_counts_dask():
+    """Test for the compute_counts() and compute_multiple() functions on a local Dask cluster."""
+    distributed = pytest.importorskip('distributed')
+    # workers are separate processes, which get the kernel from its registered name
+    with distributed.LocalCluster(n_workers=2, processes=True) as cluster, distributed.Client(cluster) as client:
+        counts = maths.compute_counts(
+            'FractalDream', P, (-3, 3), (-3, 3), n_points=100, shape=(20, 20), n_origins=5, client=client, rng=RNG
+        )
+        all_dfs = maths.compute_multiple(
+            'FractalDream', P, (-3, 3), (-3, 3), n_points=100, n_origins=3, client=client, rng=RNG
+        )
+    assert counts.shape == (20, 20)
+    assert counts.sum() == 500
+    assert len(all_dfs) == 3
+    assert all(isinstance(df, pd.DataFrame) for df in all_dfs)
+
+
+def test_register_kernel():
+    """Kernels are compiled when first requested, not when they are registered."""
+    maths.register_kernel('TestAttractor', fn)
+    try:
+        assert 'TestAttractor' not in maths.KERNELS
+        kernel = maths.get_kernel('TestAttractor')
+        assert maths.get_kernel('TestAttractor') is kernel
+        assert maths.get_kernel(kernel) is kernel
+        assert kernel(0.5, 0.5, P) == pytest.approx(fn(0.5, 0.5, 1, 2, 1, -0.5))
+    finally:
+        maths.EQUATIONS.pop('TestAttractor')
+        maths.KERNELS.pop('TestAttractor')
+
+
+def test_kernel_trajectory():
+    """Test for the kernel_trajectory() function."""
+    kernel = maths.make_kernel(fn)
+    p = np.array([1, 2, 1, -0.5, 2, 2], dtype=float)
+    points = maths.kernel_trajectory(kernel, 0.5, 0.5, p, n=5)
+    x, y = maths.trajectory_coords(fn, 0.5, 0.5, 1, 2, 1, -0.5, 2, 2, 5)
+    assert points.x.to_numpy() == pytest.approx(x)
+    assert points.y.to_numpy() == pytest.approx(y)
+
+
+def test_kernel_trajectory_counts():
+    """Test for the kernel_trajectory_counts() function."""
+    kernel = maths.make_kernel(fn)
+    p = np.array([1, 2, 1, -0.5, 2, 2], dtype=float)
+    counts = maths.kernel_trajectory_counts(kernel, 0.5, 0.5, p, 100, (-3.0, 3.0), (-3.0, 3.0), (20, 30))
+    assert counts.shape == (20, 30)
+    assert counts.sum() == 100
+    counts = maths.kernel_trajectory_counts(kernel, 0.5, 0.5, p, 100, (0.0, 3.0), (-3.0, 3.0), (20, 30))
+    assert 0 < counts.sum() < 100
+
+
+def test_ensemble_advance():
+    """Test for the ensemble_advance() function."""
+    kernel = maths.make_kernel(fn)
+    p = np.array([1, 2, 1, -0.5, 2, 2], dtype=float)
+    xs = np.linspace(-1, 1, 1000)
+    ys = np.linspace(1, -1, 1000)
+    maths.ensemble_advance(kernel, xs, ys, p, 4)
+    x, y = maths.trajectory_coords(fn, -1.0, 1.0, 1, 2, 1, -0.5, 2, 2, 5)
+    assert xs[0] == pytest.approx(x[-1])
+    assert ys[0] == pytest.approx(y[-1])
+
+
+def test_ensemble_counts():
+    """Test for the ensemble_counts() function."""
+    kernel = maths.make_kernel(fn)
+    p = np.array([1, 2, 1, -0.5, 2, 2], dtype=float)
+    xs = np.linspace(-1, 1, 1000)
+    ys = np.linspace(1, -1, 1000)
+    counts = maths.ensemble_counts(kernel, xs, ys, p, 10, (-3, 3), (-3, 3), shape=(20, 30))
+    assert counts.shape == (20, 30)
+    assert counts.sum() == 10000
+
+
+def test_process_pool_after_parallel_kernel():
+    """Worker processes can be started after a parallel kernel has run in the main process."""
+    kernel = maths.make_kernel(fn)
+    maths.ensemble_advance(kernel, np.linspace(-1, 1, 1000), np.linspace(1, -1, 1000), P, 2)
+    args = [('FractalDream', P, origin, (-3, 3), (-3, 3), 100, (20, 20)) for origin in [(0.5, 0.5), (-0.5, 0.5)]]
+    with maths.process_pool(2) as pool:
+        all_counts = pool.starmap(maths.limited_counts, args)
+    assert sum(counts.sum() for counts in all_counts) == 200
+    counts = maths.compute_counts(
+        'FractalDream', P, (-3, 3), (-3, 3), n_points=100, shape=(20, 20), n_origins=2, nprocs=2, rng=RNG
+    )
+    assert counts.sum() == 200
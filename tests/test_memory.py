@@ -0,0 +1,36 @@
+"""Tests for the memory.py module."""
+import numpy as np
+import pytest
+
+from attractors2023.memory import MB, MemoryBudget, MemoryBudgetError, estimate_bytes
+
+
+def test_estimate_bytes():
+    assert estimate_bytes(1000) == 32000
+    assert estimate_bytes(1000, dtype=np.float32) == 16000
+    assert estimate_bytes(1000, 'limited') > estimate_bytes(1000)
+    assert estimate_bytes(10**9, 'counts') == 0
+    with pytest.raises(ValueError, match='Unknown computation path'):
+        estimate_bytes(1000, 'unknown')
+
+
+def test_memory_budget():
+    budget = MemoryBudget(limit=100 * MB)
+    assert budget.fits(100 * MB)
+    assert not budget.fits(101 * MB)
+
+    with budget.reserve(60 * MB):
+        assert budget.available() == 40 * MB
+        assert budget.usage()['current'] == 60 * MB
+        with pytest.raises(MemoryBudgetError, match='only 40 MB out of 100 MB'), budget.reserve(50 * MB):
+            pass
+
+    usage = budget.usage()
+    assert usage['current'] == 0
+    assert usage['peak'] == 60 * MB
+    assert usage['limit'] == 100 * MB
+
+
+def test_memory_budget_from_environment(monkeypatch):
+    monkeypatch.setenv('ATTRACTORS2023_MEMORY_BUDGET', '256')
+    assert MemoryBudget().limit == 256 * MB
@@ -0,0 +1,47 @@
+"""Tests for the parameter_space.py module."""
+import numpy as np
+import pytest
+import xarray as xr
+
+import attractors2023.attractors as at
+from attractors2023 import parameter_space as ps
+
+
+def test_lyapunov_exponent():
+    clifford = at.Clifford(a=-1.4, b=1.6, c=1.0, d=0.7)
+    exponent = ps.lyapunov_exponent(clifford.kernel, 0.0, 0.0, clifford.params_array(), 100, 2000)
+    assert exponent > 0
+
+    # converges to a fixed point
+    dejong = at.DeJong(a=0.1, b=0.1, c=0.1, d=0.1)
+    exponent = ps.lyapunov_exponent(dejong.kernel, 0.0, 0.0, dejong.params_array(), 100, 2000)
+    assert exponent < 0
+    assert ps.trajectory_extent(dejong.kernel, 0.0, 0.0, dejong.params_array(), 100, 2000) == pytest.approx(0)
+
+
+def test_parameter_map():
+    clifford = at.Clifford()
+    agg = ps.parameter_map(clifford, 'a', 'c', resolution=(20, 10), n_iter=100)
+    assert isinstance(agg, xr.DataArray)
+    assert agg.dims == ('c', 'a')
+    assert agg.shape == (10, 20)
+    assert agg.name == 'lyapunov'
+    assert agg.a.min() > -3
+    assert agg.a.max() < 3
+    assert np.isfinite(agg).any()
+
+    agg = ps.parameter_map(clifford, 'a', 'b', x_range=(0, 1), y_range=(0, 1), resolution=5, statistic='extent')
+    assert agg.shape == (5, 5)
+    assert (agg >= 0).all()
+
+    with pytest.raises(ValueError, match='no parameter'):
+        ps.parameter_map(clifford, 'a', 'mu')
+    with pytest.raises(ValueError, match='two different parameters'):
+        ps.parameter_map(clifford, 'a', 'a')
+    with pytest.raises(ValueError, match='Unknown statistic'):
+        ps.parameter_map(clifford, 'a', 'b', statistic='entropy')
+
+
+def test_progressive_parameter_map():
+    maps = list(ps.progressive_parameter_map(at.GumowskiMira(), 'mu', 'a', resolution=16, n_levels=3, n_iter=50))
+    assert [m.shape for m in maps] == [(4, 4), (8, 8), (16, 16)]
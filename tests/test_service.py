@@ -0,0 +1,128 @@
+"""Tests for the service.py module."""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from attractors2023 import service as sv
+from attractors2023.memory import MemoryBudget
+from attractors2023.service import RenderService, make_server
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = make_server(port=0, max_workers=2, max_cached=4, budget=MemoryBudget(limit=10**9))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.service.shutdown()
+
+
+def get(server, path):
+    with urllib.request.urlopen(f'http://127.0.0.1:{server.server_port}{path}') as response:  # noqa: S310
+        return response.status, response.headers['Content-Type'], response.read()
+
+
+def test_render(server):
+    path = '/render?family=Clifford&a=-1.4&b=1.6&c=1.0&d=0.7&colormap=fire&size=50&n=1000'
+    status, content_type, body = get(server, path)
+    assert status == 200
+    assert content_type == 'image/png'
+    assert body.startswith(PNG_SIGNATURE)
+
+    # second request is served from the cache
+    assert get(server, path)[2] == body
+    stats = json.loads(get(server, '/stats')[2])
+    assert stats['completed'] >= 2
+    assert stats['cache']['hits'] >= 1
+    assert stats['latency_max'] > 0
+    assert stats['throughput'] > 0
+
+
+def test_render_defaults(server):
+    """Parameters that are not given come from attractors.yml, whatever the previous requests."""
+    default = get(server, '/render?family=DeJong&size=40&n=1000')[2]
+    get(server, '/render?family=DeJong&a=1.5&b=-1.8&colormap=fire&size=40&n=1000')
+    assert get(server, '/render?family=DeJong&size=40&n=1000')[2] == default
+    assert server.service.params.attractors['DeJong'].vals() == ['DeJong', *server.service.params.args('DeJong')[0]]
+
+
+def test_render_errors(server):
+    for path in [
+        '/render?family=Unknown',
+        '/render?family=Clifford&a=abc',
+        '/render?family=Clifford&colormap=unknown',
+        '/render?family=Clifford&size=0',
+        '/render?family=Clifford&n=1000000000000',
+    ]:
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            get(server, path)
+        assert exc_info.value.code == 400
+
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        get(server, '/unknown')
+    assert exc_info.value.code == 404
+
+
+def test_render_failure(monkeypatch):
+    """Unexpected failures of the computation are answered with an error status and counted."""
+
+    def fail(*args, **kwargs):
+        msg = 'kernel crashed'
+        raise RuntimeError(msg)
+
+    monkeypatch.setattr(sv, 'render_within_budget', fail)
+    service = RenderService(max_workers=1)
+    try:
+        status, content_type, body = service.handle({'family': 'Clifford', 'size': '40', 'n': '1000'})
+    finally:
+        service.shutdown()
+    assert status == 500
+    assert content_type == 'text/plain'
+    assert b'kernel crashed' in body
+    assert service.stats()['errors'] == 1
+
+
+def test_render_concurrency(monkeypatch):
+    """No more than max_workers renders run at the same time, however many requests arrive."""
+    render = sv.render_within_budget
+    lock = threading.Lock()
+    running = []
+    active = 0
+
+    def tracked_render(*args, **kwargs):
+        nonlocal active
+        with lock:
+            active += 1
+            running.append(active)
+        time.sleep(0.2)
+        try:
+            return render(*args, **kwargs)
+        finally:
+            with lock:
+                active -= 1
+
+    monkeypatch.setattr(sv, 'render_within_budget', tracked_render)
+    service = RenderService(max_workers=2)
+    # requests of different sizes are not merged by the coordinator
+    threads = [
+        threading.Thread(target=service.handle, args=({'family': 'Clifford', 'size': str(20 + i), 'n': '1000'},))
+        for i in range(6)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        service.shutdown()
+    assert len(running) == 6
+    assert max(running) == 2
+    assert service.stats()['completed'] == 6
@@ -2,12 +2,48 @@
 
 import numpy as np
 import pandas as pd
+import pytest
 from datashader import transfer_functions as tf
 
-from attractors2023.shared import render_attractor
+import attractors2023.attractors as at
+from attractors2023.memory import MB, MemoryBudget, MemoryBudgetError
+from attractors2023.shared import render_attractor, render_counts, render_ensemble, render_within_budget
 
 
 def test_render():
     trajectory = pd.DataFrame(np.random.default_rng().random((30, 2)), columns=list('xy'))
     image = list(render_attractor(trajectory, plot_type='points', cmap=None, size=400))
     assert isinstance(image[0], tf.Image)
+
+
+def test_render_counts():
+    counts = np.random.default_rng().integers(0, 5, size=(40, 30))
+    image = render_counts(counts, xlim=(-2, 2), ylim=(-1, 1), cmap=None)
+    assert isinstance(image, tf.Image)
+    assert image.shape == (40, 30)
+
+
+def test_render_within_budget():
+    clifford = at.Clifford()
+    image = render_within_budget(clifford, n=1000, size=50, budget=MemoryBudget(limit=MB))
+    assert isinstance(image, tf.Image)
+
+    # too large for the budget: the trajectory is aggregated on the fly
+    image = render_within_budget(clifford, n=1000, size=50, budget=MemoryBudget(limit=1000))
+    assert isinstance(image, tf.Image)
+    assert image.shape == (50, 50)
+
+    # memory reserved by another computation: fall back to aggregation instead of failing
+    budget = MemoryBudget(limit=MB)
+    with budget.reserve(MB - 1000):
+        image = render_within_budget(clifford, n=1000, size=50, budget=budget)
+    assert isinstance(image, tf.Image)
+
+    with pytest.raises(MemoryBudgetError, match='"points" plot type'):
+        render_within_budget(clifford, n=1000, plot_type='line', size=50, budget=MemoryBudget(limit=1000))
+
+
+def test_render_ensemble():
+    image = render_ensemble(at.Clifford(), n_particles=1000, n_steps=5, burn_in=5, size=50)
+    assert isinstance(image, tf.Image)
+    assert image.shape == (50, 50)